@@ -0,0 +1,147 @@
+"""Journal reader: runs journalctl and parses its JSON output.
+
+Run as ``python -m log_viewer.journal <journalctl argv...>`` this module acts
+as a reader process for the GUI: it parses entries outside the GTK process and
+writes them to stdout as length-prefixed pickled batches. It must not import gi.
+"""
+import os
+import pickle
+import signal
+import struct
+import subprocess
+import sys
+from datetime import datetime
+
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+# Fields requested from journalctl -o json; __REALTIME_TIMESTAMP is always sent
+JOURNAL_FIELDS = "PRIORITY,_HOSTNAME,SYSLOG_IDENTIFIER,_PID,MESSAGE"
+
+_FRAME_HEADER = struct.Struct("<I")
+
+# Directory holding the log_viewer package, put first on the reader's sys.path
+_PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def read_line_batches(stream, chunk_size=65536):
+    """Yield lists of raw byte lines, one list per chunk read from a pipe.
+
+    Reading whole chunks coalesces bursts into a single batch while still
+    flushing a lone line as soon as it arrives.
+    """
+    fd = stream.fileno()
+    rest = b""
+    while True:
+        chunk = os.read(fd, chunk_size)
+        if not chunk:
+            break
+        raw = (rest + chunk).split(b"\n")
+        rest = raw.pop()
+        lines = [line for line in raw if line.strip()]
+        if lines:
+            yield lines
+    if rest.strip():
+        yield [rest]
+
+
+def _field_str(value):
+    """Decode a journal JSON field value into text."""
+    if isinstance(value, list):
+        if value and isinstance(value[0], int):  # non-UTF-8 data as a byte array
+            return bytes(value).decode("utf-8", "replace")
+        return _field_str(value[0]) if value else ""  # repeated field
+    return value or ""
+
+
+def parse_entry(line):
+    """Parse one journalctl JSON line, given as bytes.
+
+    Returns (priority, timestamp, message, text) where text is the entry
+    rendered like short-iso output, or None if the line is not an entry.
+    """
+    try:
+        entry = _json_loads(line)
+        usec = int(entry["__REALTIME_TIMESTAMP"])
+    except (ValueError, KeyError, TypeError):
+        return None
+    ts = datetime.fromtimestamp(usec / 1_000_000).astimezone().strftime("%Y-%m-%dT%H:%M:%S%z")
+    prio = _field_str(entry.get("PRIORITY")) or "6"  # default info
+    msg = _field_str(entry.get("MESSAGE"))
+    ident = _field_str(entry.get("SYSLOG_IDENTIFIER"))
+    pid = _field_str(entry.get("_PID"))
+    if pid:
+        ident = f"{ident}[{pid}]"
+    text = f"{ts} {_field_str(entry.get('_HOSTNAME'))} {ident}: {msg}"
+    return prio, ts, msg, text
+
+
+def reader_cmd(cmd):
+    """Wrap a journalctl command line so it runs through this module.
+
+    The reader is not started with ``-m``: that would put the current
+    directory first on sys.path, so a stray struct.py or datetime.py in the
+    GUI's working directory would shadow the standard library.
+    """
+    boot = f"import sys; sys.path[0] = {_PACKAGE_PARENT!r}; from log_viewer.journal import main; main()"
+    return [sys.executable, "-c", boot] + cmd
+
+
+class FrameReader:
+    """Reassembles entry batches from non-blocking reads of a reader pipe."""
+
+    def __init__(self):
+        self._buf = bytearray()
+
+    def feed(self, data):
+        """Append *data* and return the list of batches it completed."""
+        buf = self._buf
+        buf += data
+        batches = []
+        pos = 0
+        with memoryview(buf) as view:
+            while len(buf) - pos >= _FRAME_HEADER.size:
+                (size,) = _FRAME_HEADER.unpack_from(buf, pos)
+                start = pos + _FRAME_HEADER.size
+                if len(buf) < start + size:
+                    break
+                batches.append(pickle.loads(view[start:start + size]))
+                pos = start + size
+        del buf[:pos]
+        return batches
+
+
+def _send(out, entries):
+    data = pickle.dumps(entries, pickle.HIGHEST_PROTOCOL)
+    out.write(_FRAME_HEADER.pack(len(data)) + data)
+    out.flush()
+
+
+def main(argv=None):
+    """Run journalctl and write parsed entry batches to stdout."""
+    argv = sys.argv[1:] if argv is None else argv
+    out = sys.stdout.buffer
+    # Turn SIGTERM into SystemExit so journalctl is stopped on the way out
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        proc = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0)
+    except OSError as e:
+        _send(out, [("3", "", str(e), str(e))])
+        return
+    try:
+        for lines in read_line_batches(proc.stdout):
+            entries = [e for e in map(parse_entry, lines) if e is not None]
+            if entries:
+                _send(out, entries)
+    except BrokenPipeError:
+        # The viewer went away; keep the interpreter from flushing again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), out.fileno())
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    main()
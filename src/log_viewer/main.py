@@ -2,12 +2,17 @@
 import gi
 gi.require_version('Gtk', '4.0')
 gi.require_version('Adw', '1')
-from gi.repository import Gtk, Adw, GLib, Gio, Pango
+from gi.repository import Gtk, Adw, GLib, Gio, GObject, Pango
+import importlib.util
+import json
+import os
 import subprocess
-import threading
+import tempfile
 import gettext
 from datetime import datetime
 from log_viewer.accessibility import AccessibilityManager
+from log_viewer.journal import JOURNAL_FIELDS, FrameReader, reader_cmd
+from log_viewer.spool import ExportSpool
 
 _ = gettext.gettext
 APP_ID = "io.github.yeager.LogViewer"
@@ -25,33 +30,94 @@ PRIORITY_COLORS = {
 
 PRIORITY_NAMES = ["emerg", "alert", "crit", "err", "warning", "notice", "info", "debug"]
 
+# Rows kept in the view by default; the oldest are dropped beyond this
+MAX_ROWS = 100_000
+
+# Search only looks at the start of a message; stack traces and JSON payloads
+# can run to many KB and nobody searches for text that deep in them
+SEARCH_CHARS = 4096
+
+class LogRow(GObject.Object):
+    """A single journal entry, as stored in the log list model."""
+    priority = GObject.Property(type=str, default="")
+    timestamp = GObject.Property(type=str, default="")
+    message = GObject.Property(type=str, default="")
+
+    def __init__(self, priority="", timestamp="", message=""):
+        super().__init__(priority=priority, timestamp=timestamp, message=message)
+        # Lowered UTF-8 search key, kept as a plain attribute so the filter
+        # reads it without a GObject property lookup
+        self.search_key = message[:SEARCH_CHARS].lower().encode()
+        self.text_end = None  # end offset of the export text, see _add_rows
+
+
+def _stop_proc(proc):
+    if proc is None:
+        return
+    try:
+        proc.terminate()
+    except Exception:
+        pass
+
+
+def _read_json_async(path, callback):
+    """Read JSON from *path* without blocking the main loop.
+
+    *callback* receives the decoded data, or None if the file is missing or
+    invalid.
+    """
+    def on_loaded(file, result):
+        try:
+            _ok, contents, _etag = file.load_contents_finish(result)
+            data = json.loads(contents)
+        except (GLib.Error, ValueError):
+            data = None
+        callback(data)
+    Gio.File.new_for_path(path).load_contents_async(None, on_loaded)
+
+
+def _write_json_async(path, data, indent=None):
+    """Write *data* as JSON to *path* without blocking the main loop."""
+    # Hold the application so quitting right after a save does not drop it
+    app = Gio.Application.get_default()
+    if app:
+        app.hold()
+
+    def on_written(file, result):
+        try:
+            file.replace_contents_finish(result)
+        except GLib.Error:
+            pass
+        if app:
+            app.release()
+    contents = GLib.Bytes.new(json.dumps(data, indent=indent).encode())
+    Gio.File.new_for_path(path).replace_contents_bytes_async(
+        contents, None, False, Gio.FileCreateFlags.REPLACE_DESTINATION, None, on_written)
+
+
+_WLC_PATH = os.path.join(os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config"),
+                         "log-viewer", "welcome.json")
+_wlc_dir_made = False
 
 
 def _wlc_settings_path():
-    import os
-    xdg = os.environ.get("XDG_CONFIG_HOME", os.path.expanduser("~/.config"))
-    d = os.path.join(xdg, "log-viewer")
-    os.makedirs(d, exist_ok=True)
-    return os.path.join(d, "welcome.json")
-
-def _load_wlc_settings():
-    import os, json
-    p = _wlc_settings_path()
-    if os.path.exists(p):
-        with open(p) as f:
-            return json.load(f)
-    return {"welcome_shown": False}
+    global _wlc_dir_made
+    if not _wlc_dir_made:
+        os.makedirs(os.path.dirname(_WLC_PATH), exist_ok=True)
+        _wlc_dir_made = True
+    return _WLC_PATH
+
+def _load_wlc_settings(callback):
+    _read_json_async(_WLC_PATH, lambda s: callback(s or {"welcome_shown": False}))
 
 def _save_wlc_settings(s):
-    import json
-    with open(_wlc_settings_path(), "w") as f:
-        json.dump(s, f, indent=2)
+    _write_json_async(_wlc_settings_path(), s, indent=2)
 
 class LogViewerWindow(Adw.ApplicationWindow):
     def __init__(self, **kwargs):
         super().__init__(**kwargs, title=_("Log Viewer"), default_width=1100, default_height=700)
+        self._load_proc = None
         self._follow_proc = None
-        self._follow_running = False
 
         header = Adw.HeaderBar()
         self.theme_btn = Gtk.Button(icon_name="weather-clear-night-symbolic", tooltip_text=_("Toggle theme"))
@@ -65,6 +131,13 @@ class LogViewerWindow(Adw.ApplicationWindow):
         export_btn.connect("clicked", self._export_logs)
         header.pack_end(export_btn)
 
+        self._max_rows = MAX_ROWS
+        self.max_rows_spin = Gtk.SpinButton.new_with_range(1000, 1_000_000, 1000)
+        self.max_rows_spin.set_value(MAX_ROWS)
+        self.max_rows_spin.set_tooltip_text(_("Maximum entries kept"))
+        self.max_rows_spin.connect("value-changed", self._on_max_rows_changed)
+        header.pack_start(self.max_rows_spin)
+
         # Filters bar
         filters = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8,
                           margin_start=12, margin_end=12, margin_top=8)
@@ -98,31 +171,41 @@ class LogViewerWindow(Adw.ApplicationWindow):
         self.search_entry.connect("changed", self._filter_view)
         search_bar.append(self.search_entry)
 
-        # Log view
+        # Log view - messages are lowered once on insert and the search text
+        # once per change, so a row check is a single bytes substring test.
+        # No filter is attached while the search is empty.
         sw = Gtk.ScrolledWindow(vexpand=True, margin_start=12, margin_end=12, margin_top=8, margin_bottom=4)
-        self.log_store = Gtk.ListStore(str, str, str)  # priority, timestamp, message
-        self.log_filter = self.log_store.filter_new()
-        self.log_filter.set_visible_func(self._filter_func)
-        self.tree = Gtk.TreeView(model=self.log_filter, headers_visible=True)
-        self.tree.set_enable_search(True)
-
-        for i, title in enumerate([_("Priority"), _("Timestamp"), _("Message")]):
-            renderer = Gtk.CellRendererText()
-            if i == 0:
-                renderer.set_property("font", "monospace 9")
-            elif i == 2:
-                renderer.set_property("font", "monospace 9")
-                renderer.set_property("ellipsize", Pango.EllipsizeMode.END)
-            col = Gtk.TreeViewColumn(title, renderer, text=i)
-            col.set_resizable(True)
-            if i == 2:
+        self.log_store = Gio.ListStore.new(LogRow)
+        self._search_key = b""
+        self._filter_source_id = 0
+        self.log_search_filter = Gtk.CustomFilter.new(self._filter_func)
+        self.log_filter = Gtk.FilterListModel(model=self.log_store)
+        self.tree = Gtk.ColumnView(model=Gtk.SingleSelection(model=self.log_filter))
+
+        self._mono_attrs = Pango.AttrList()
+        self._mono_attrs.insert(Pango.attr_font_desc_new(Pango.FontDescription.from_string("monospace 9")))
+        # One attribute list per priority, shared by every priority cell
+        self._prio_attrs = {}
+        for prio, hex_color in PRIORITY_COLORS.items():
+            color = Pango.Color()
+            color.parse(hex_color)
+            attrs = self._mono_attrs.copy()
+            attrs.insert(Pango.attr_foreground_new(color.red, color.green, color.blue))
+            self._prio_attrs[prio] = attrs
+        for title, prop in [(_("Priority"), "priority"), (_("Timestamp"), "timestamp"), (_("Message"), "message")]:
+            factory = Gtk.SignalListItemFactory()
+            factory.connect("setup", self._on_cell_setup, prop)
+            factory.connect("bind", self._on_cell_bind, prop)
+            col = Gtk.ColumnViewColumn(title=title, factory=factory, resizable=True)
+            if prop == "message":
                 col.set_expand(True)
             self.tree.append_column(col)
 
         sw.set_child(self.tree)
 
         self.statusbar = Gtk.Label(label="", xalign=0, css_classes=["dim-label"], margin_start=12, margin_bottom=4)
-        self._all_lines = []
+        # Export text is appended to a temp file rather than kept in memory
+        self._spool = ExportSpool()
 
         content = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
         content.append(header)
@@ -132,11 +215,16 @@ class LogViewerWindow(Adw.ApplicationWindow):
         content.append(self.statusbar)
         self.set_content(content)
 
+        # The count follows the store; only the clock needs a timer, and it
+        # may lag up to 10 s behind
+        self._status_count = -1
+        self._status_source_id = 0
+        self.log_store.connect("items-changed", self._on_store_changed)
         self._update_status()
-        GLib.timeout_add_seconds(1, self._update_status)
+        GLib.timeout_add_seconds(10, self._update_status)
 
     def _build_cmd(self, follow=False):
-        cmd = ["journalctl", "--no-pager", "-o", "short-iso"]
+        cmd = ["journalctl", "--no-pager", "--all", "-o", "json", "--output-fields", JOURNAL_FIELDS]
         unit = self.unit_entry.get_text().strip()
         if unit:
             cmd += ["-u", unit]
@@ -152,68 +240,187 @@ class LogViewerWindow(Adw.ApplicationWindow):
             cmd += ["-n", "1000"]
         return cmd
 
+    def _on_cell_setup(self, _factory, item, prop):
+        label = Gtk.Label(xalign=0, single_line_mode=True)
+        if prop != "timestamp":
+            label.set_attributes(self._mono_attrs)
+        if prop == "message":
+            label.set_ellipsize(Pango.EllipsizeMode.END)
+        item.set_child(label)
+
+    def _on_cell_bind(self, _factory, item, prop):
+        label = item.get_child()
+        value = item.get_item().get_property(prop)
+        label.set_label(value)
+        if prop == "priority":
+            label.set_attributes(self._prio_attrs.get(value, self._mono_attrs))
+
     def _load_logs(self, _btn=None):
-        self.log_store.clear()
-        self._all_lines.clear()
-        cmd = self._build_cmd()
+        _stop_proc(self._load_proc)
+        self.log_store.remove_all()
+        self._spool.clear()
+        self._load_proc = self._spawn_reader(self._build_cmd(), timeout=10)
+
+    def _spawn_reader(self, cmd, timeout=None):
+        """Run journalctl *cmd* through a reader process and stream its entries in.
+
+        The reader process does the JSON parsing. Its pipe is watched from the
+        main loop, so batches land in the store without a thread or idle_add.
+        Its stderr goes to a temp file, reported if the reader fails.
+        """
+        errlog = tempfile.TemporaryFile()
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-            lines = result.stdout.strip().split("\n") if result.stdout.strip() else []
-            for line in lines:
-                self._add_line(line)
+            proc = subprocess.Popen(reader_cmd(cmd), stdout=subprocess.PIPE, stderr=errlog, bufsize=0)
         except Exception as e:
-            self.log_store.append(["3", "", str(e)])
-        self._update_status()
-
-    def _add_line(self, line):
-        # Try to parse priority from line - journalctl short-iso format
-        parts = line.split(" ", 3)
-        ts = parts[0] if parts else ""
-        msg = parts[-1] if len(parts) > 1 else line
-        prio = "6"  # default info
-        for kw, p in [("error", "3"), ("err", "3"), ("warning", "4"), ("warn", "4"),
-                       ("crit", "2"), ("alert", "1"), ("emerg", "0"), ("debug", "7"), ("notice", "5")]:
-            if kw in line.lower():
-                prio = p
-                break
-        self.log_store.append([prio, ts, msg])
-        self._all_lines.append(line)
+            errlog.close()
+            self._add_rows([LogRow(priority="3", message=str(e))])
+            return None
+        fd = proc.stdout.fileno()
+        os.set_blocking(fd, False)
+        frames = FrameReader()
+        GLib.unix_fd_add_full(GLib.PRIORITY_DEFAULT, fd, GLib.IOCondition.IN | GLib.IOCondition.HUP,
+                              lambda fd, _cond: self._on_reader_readable(fd, proc, frames, errlog))
+        if timeout:
+            GLib.timeout_add_seconds(timeout, self._on_reader_timeout, proc, timeout)
+        return proc
+
+    def _on_reader_timeout(self, proc, timeout):
+        if proc.poll() is None:
+            _stop_proc(proc)
+            if self._is_current(proc):
+                msg = _("Loading stopped after {} seconds; not all entries were loaded").format(timeout)
+                self._add_rows([LogRow(priority="3", message=msg)])
+        return GLib.SOURCE_REMOVE
+
+    def _on_reader_readable(self, fd, proc, frames, errlog):
+        # Drain what is already in the pipe (up to 1 MiB per wakeup) so a
+        # bulk load is inserted with one splice rather than one per batch
+        entries = []
+        eof = False
+        try:
+            for _i in range(16):
+                try:
+                    data = os.read(fd, 65536)
+                except BlockingIOError:
+                    break
+                except OSError:
+                    data = b""
+                if not data:
+                    eof = True
+                    break
+                for batch in frames.feed(data):
+                    entries += batch
+            if entries:
+                self._add_entries_batch(entries, proc)
+        except Exception as e:
+            # A corrupt frame or a failed spool write ends this reader
+            _stop_proc(proc)
+            eof = True
+            if self._is_current(proc):
+                self._add_rows([LogRow(priority="3", message=_("Reading logs failed: {}").format(e))])
+        if not eof:
+            return GLib.SOURCE_CONTINUE
+        proc.stdout.close()
+        if self._reap_reader(proc, errlog):
+            GLib.timeout_add(100, self._reap_reader, proc, errlog)
+        return GLib.SOURCE_REMOVE
+
+    def _reap_reader(self, proc, errlog):
+        """Collect the exit status of *proc* without blocking and report a failure.
+
+        Returns True while the reader is still running, so it can be polled
+        from a timeout.
+        """
+        if proc.poll() is None:
+            return GLib.SOURCE_CONTINUE
+        # A stopped reader exits 0 or by signal; anything else is a crash
+        if proc.returncode > 0 and self._is_current(proc):
+            errlog.seek(max(os.fstat(errlog.fileno()).st_size - 4096, 0))
+            lines = errlog.read().decode("utf-8", "replace").strip().splitlines()
+            msg = lines[-1] if lines else _("Log reader exited with status {}").format(proc.returncode)
+            self._add_rows([LogRow(priority="3", message=msg)])
+        errlog.close()
+        return GLib.SOURCE_REMOVE
+
+    def _is_current(self, proc):
+        return proc is self._load_proc or proc is self._follow_proc
+
+    def _add_entries_batch(self, entries, proc):
+        # Drop what a replaced load or a stopped follow still had in its pipe
+        if not self._is_current(proc):
+            return
+        ends = self._spool.append([text for _prio, _ts, _msg, text in entries])
+        rows = []
+        for (prio, ts, msg, _text), end in zip(entries, ends):
+            row = LogRow(priority=prio, timestamp=ts, message=msg)
+            row.text_end = end
+            rows.append(row)
+        self._add_rows(rows)
+
+    def _add_rows(self, rows):
+        for row in rows:
+            if row.text_end is None:
+                row.text_end = self._spool.end
+        # Stay within _max_rows: drop the oldest stored rows, then any
+        # surplus at the front of this batch
+        self._trim_rows(self._max_rows - len(rows))
+        if len(rows) > self._max_rows:
+            self._forget_upto(rows[-self._max_rows - 1])
+            rows = rows[-self._max_rows:]
+        # A single splice emits one items-changed for the whole batch
+        self.log_store.splice(self.log_store.get_n_items(), 0, rows)
+
+    def _trim_rows(self, keep):
+        """Drop the oldest rows so that at most *keep* remain in the store."""
+        excess = self.log_store.get_n_items() - max(keep, 0)
+        if excess <= 0:
+            return
+        self._forget_upto(self.log_store.get_item(excess - 1))
+        self.log_store.splice(0, excess, [])
+
+    def _forget_upto(self, last):
+        """Release the export text of rows up to *last*."""
+        self._spool.forget_upto(last.text_end)
+
+    def _on_max_rows_changed(self, spin):
+        self._max_rows = spin.get_value_as_int()
+        self._trim_rows(self._max_rows)
 
     def _toggle_follow(self, btn):
         if btn.get_active():
-            self._follow_running = True
-            t = threading.Thread(target=self._follow_thread, daemon=True)
-            t.start()
+            self._follow_proc = self._spawn_reader(self._build_cmd(follow=True))
         else:
-            self._follow_running = False
-            if self._follow_proc:
-                try:
-                    self._follow_proc.terminate()
-                except Exception:
-                    pass
-
-    def _follow_thread(self):
-        cmd = self._build_cmd(follow=True)
-        try:
-            self._follow_proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            for line in self._follow_proc.stdout:
-                if not self._follow_running:
-                    break
-                line = line.strip()
-                if line:
-                    GLib.idle_add(self._add_line, line)
-        except Exception:
-            pass
+            _stop_proc(self._follow_proc)
+            self._follow_proc = None
 
-    def _filter_func(self, model, iter, _data=None):
-        search = self.search_entry.get_text().lower()
-        if not search:
-            return True
-        msg = model[iter][2] or ""
-        return search in msg.lower()
+    def _filter_func(self, row):
+        return self._search_key in row.search_key
 
     def _filter_view(self, *_args):
-        self.log_filter.refilter()
+        # Coalesce a burst of keystrokes into one refilter
+        if self._filter_source_id:
+            GLib.source_remove(self._filter_source_id)
+        self._filter_source_id = GLib.timeout_add(120, self._do_refilter)
+
+    def _do_refilter(self):
+        self._filter_source_id = 0
+        old = self._search_key
+        new = self.search_entry.get_text().lower().encode()
+        if new == old:
+            return GLib.SOURCE_REMOVE
+        self._search_key = new
+        if not new:
+            self.log_filter.set_filter(None)
+        elif not old:
+            self.log_filter.set_filter(self.log_search_filter)
+        elif old in new:
+            # Typing more only hides rows, so only visible rows are rechecked
+            self.log_search_filter.changed(Gtk.FilterChange.MORE_STRICT)
+        elif new in old:
+            self.log_search_filter.changed(Gtk.FilterChange.LESS_STRICT)
+        else:
+            self.log_search_filter.changed(Gtk.FilterChange.DIFFERENT)
+        return GLib.SOURCE_REMOVE
 
     def _export_logs(self, _btn):
         dialog = Gtk.FileChooserNative(
@@ -226,13 +433,24 @@ class LogViewerWindow(Adw.ApplicationWindow):
     def _on_export_response(self, dialog, response):
         if response == Gtk.ResponseType.ACCEPT:
             path = dialog.get_file().get_path()
-            with open(path, 'w') as f:
-                f.write("\n".join(self._all_lines))
+            with open(path, 'wb') as f:
+                self._spool.copy_to(f)
+
+    def _on_store_changed(self, *_args):
+        # Coalesce a burst of inserts in follow mode into one update
+        if not self._status_source_id:
+            self._status_source_id = GLib.timeout_add(200, self._update_count)
+
+    def _update_count(self):
+        self._status_source_id = 0
+        if self.log_store.get_n_items() != self._status_count:
+            self._update_status()
+        return GLib.SOURCE_REMOVE
 
     def _update_status(self):
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        count = len(self.log_store)
-        self.statusbar.set_label(f"  {count} entries | {now}")
+        self._status_count = self.log_store.get_n_items()
+        self.statusbar.set_label(f"  {self._status_count} entries | {now}")
         return True
 
     def _toggle_theme(self, _btn):
@@ -269,11 +487,13 @@ class LogViewerApp(Adw.Application):
         win = self.props.active_window or LogViewerWindow(application=self)
         win.present()
         # Welcome dialog
-        self._wlc_settings = _load_wlc_settings()
+        _load_wlc_settings(self._on_wlc_settings_loaded)
+
+    def _on_wlc_settings_loaded(self, settings):
+        self._wlc_settings = settings
         if not self._wlc_settings.get("welcome_shown"):
             self._show_welcome(self.props.active_window or self)
 
-
     def do_startup(self):
         Adw.Application.do_startup(self)
         quit_action = Gio.SimpleAction.new("quit", None)
@@ -281,15 +501,6 @@ class LogViewerApp(Adw.Application):
         self.add_action(quit_action)
         self.set_accels_for_action("app.quit", ["<Control>q"])
 
-
-def main():
-    app = LogViewerApp()
-    app.run()
-
-
-if __name__ == "__main__":
-    main()
-
     def _show_welcome(self, win):
         dialog = Adw.Dialog()
         dialog.set_title(_("Welcome"))
@@ -320,38 +531,40 @@ if __name__ == "__main__":
         dialog.close()
 
 
+def main():
+    app = LogViewerApp()
+    app.run()
+
+
+if __name__ == "__main__":
+    main()
+
 
 # --- Session restore ---
-import json as _json
-import os as _os
 
 def _save_session(window, app_name):
-    config_dir = _os.path.join(_os.path.expanduser('~'), '.config', app_name)
-    _os.makedirs(config_dir, exist_ok=True)
+    config_dir = os.path.join(os.path.expanduser('~'), '.config', app_name)
+    os.makedirs(config_dir, exist_ok=True)
     state = {'width': window.get_width(), 'height': window.get_height(),
              'maximized': window.is_maximized()}
-    try:
-        with open(_os.path.join(config_dir, 'session.json'), 'w') as f:
-            _json.dump(state, f)
-    except OSError:
-        pass
+    _write_json_async(os.path.join(config_dir, 'session.json'), state)
 
 def _restore_session(window, app_name):
-    path = _os.path.join(_os.path.expanduser('~'), '.config', app_name, 'session.json')
+    # Read synchronously: the size only applies before the window is mapped
+    path = os.path.join(os.path.expanduser('~'), '.config', app_name, 'session.json')
     try:
         with open(path) as f:
-            state = _json.load(f)
+            state = json.load(f)
         window.set_default_size(state.get('width', 800), state.get('height', 600))
         if state.get('maximized'):
             window.maximize()
-    except (FileNotFoundError, _json.JSONDecodeError, OSError):
+    except (FileNotFoundError, json.JSONDecodeError, OSError):
         pass
 
 
 # --- Fullscreen toggle (F11) ---
 def _setup_fullscreen(window, app):
     """Add F11 fullscreen toggle."""
-    from gi.repository import Gio
     if not app.lookup_action('toggle-fullscreen'):
         action = Gio.SimpleAction.new('toggle-fullscreen', None)
         action.connect('activate', lambda a, p: (
@@ -362,18 +575,16 @@ def _setup_fullscreen(window, app):
 
 
 # --- Plugin system ---
-import importlib.util
-import os as _pos
 
 def _load_plugins(app_name):
     """Load plugins from ~/.config/<app>/plugins/."""
-    plugin_dir = _pos.path.join(_pos.path.expanduser('~'), '.config', app_name, 'plugins')
+    plugin_dir = os.path.join(os.path.expanduser('~'), '.config', app_name, 'plugins')
     plugins = []
-    if not _pos.path.isdir(plugin_dir):
+    if not os.path.isdir(plugin_dir):
         return plugins
-    for fname in sorted(_pos.listdir(plugin_dir)):
+    for fname in sorted(os.listdir(plugin_dir)):
         if fname.endswith('.py') and not fname.startswith('_'):
-            path = _pos.path.join(plugin_dir, fname)
+            path = os.path.join(plugin_dir, fname)
             try:
                 spec = importlib.util.spec_from_file_location(fname[:-3], path)
                 mod = importlib.util.module_from_spec(spec)
@@ -0,0 +1,75 @@
+"""Export text spool: the text of the rows in the view, kept in a temp file.
+
+It must not import gi, so the offset bookkeeping can be tested on its own.
+"""
+import os
+import tempfile
+
+
+def _spool_file():
+    return tempfile.NamedTemporaryFile(prefix="log-viewer-", suffix=".log", buffering=64 * 1024)
+
+
+def _copy_range(src, dst, offset, end):
+    """Copy bytes [offset, end) of file *src* into file *dst* with sendfile."""
+    src.flush()
+    while offset < end:
+        sent = os.sendfile(dst.fileno(), src.fileno(), offset, end - offset)
+        if not sent:
+            break
+        offset += sent
+
+
+class ExportSpool:
+    """Append-only export text with the oldest part dropped as rows go.
+
+    Offsets are logical and only grow: the file starts at _base, the text of
+    dropped rows ends at _dead and everything ends at end. Once the dead
+    prefix outgrows the live text (and *compact_bytes*), the live tail is
+    copied into a fresh file.
+    """
+
+    def __init__(self, compact_bytes=1 << 20):
+        self._compact_bytes = compact_bytes
+        self._file = _spool_file()
+        self._base = self._dead = self._end = 0
+
+    @property
+    def end(self):
+        """Logical offset just past the last text appended."""
+        return self._end
+
+    def append(self, texts):
+        """Append one line per text and return the end offset of each."""
+        ends = []
+        chunks = []
+        end = self._end
+        for text in texts:
+            data = (text + "\n").encode("utf-8", "replace")
+            end += len(data)
+            ends.append(end)
+            chunks.append(data)
+        if chunks:
+            self._file.write(b"".join(chunks))
+        self._end = end
+        return ends
+
+    def forget_upto(self, offset):
+        """Drop the text before *offset*, the end offset of the last dropped row."""
+        self._dead = offset
+        if self._dead - self._base > max(self._end - self._dead, self._compact_bytes):
+            spool = _spool_file()
+            _copy_range(self._file, spool, self._dead - self._base, self._end - self._base)
+            spool.seek(0, os.SEEK_END)
+            self._file.close()
+            self._file = spool
+            self._base = self._dead
+
+    def copy_to(self, dst):
+        """Write the text that has not been dropped to the file object *dst*."""
+        _copy_range(self._file, dst, self._dead - self._base, self._end - self._base)
+
+    def clear(self):
+        self._file.seek(0)
+        self._file.truncate()
+        self._base = self._dead = self._end = 0
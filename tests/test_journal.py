@@ -0,0 +1,137 @@
+"""Tests for the journal reader: field decoding, line batching and framing."""
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+from datetime import datetime
+
+from log_viewer.journal import (FrameReader, _field_str, _send, parse_entry,
+                                read_line_batches, reader_cmd)
+
+
+def _line(**fields):
+    fields.setdefault("__REALTIME_TIMESTAMP", "1700000000000000")
+    return json.dumps(fields).encode()
+
+
+def _iso(usec):
+    return datetime.fromtimestamp(usec / 1_000_000).astimezone().strftime("%Y-%m-%dT%H:%M:%S%z")
+
+
+def test_field_str_plain_and_missing():
+    assert _field_str("sshd") == "sshd"
+    assert _field_str(None) == ""
+    assert _field_str([]) == ""
+
+
+def test_field_str_byte_array():
+    assert _field_str(list(b"caf\xc3\xa9")) == "café"
+    assert _field_str(list(b"bad \xff byte")) == "bad � byte"
+
+
+def test_field_str_repeated_field_uses_first_value():
+    assert _field_str(["first", "second"]) == "first"
+    assert _field_str([list(b"raw"), "other"]) == "raw"
+
+
+def test_parse_entry_renders_short_iso_text():
+    line = _line(PRIORITY="3", _HOSTNAME="host", SYSLOG_IDENTIFIER="sshd", _PID="42", MESSAGE="boom")
+    ts = _iso(1700000000000000)
+    assert parse_entry(line) == ("3", ts, "boom", f"{ts} host sshd[42]: boom")
+
+
+def test_parse_entry_defaults():
+    prio, ts, msg, text = parse_entry(_line(SYSLOG_IDENTIFIER="kernel", MESSAGE=None))
+    assert prio == "6"
+    assert msg == ""
+    assert text == f"{ts}  kernel: "
+
+
+def test_parse_entry_byte_array_message():
+    _prio, _ts, msg, text = parse_entry(_line(MESSAGE=list(b"bin\x00\xfe")))
+    assert msg == "bin\x00�"
+    assert text.endswith(": bin\x00�")
+
+
+def test_parse_entry_rejects_non_entries():
+    assert parse_entry(b"not json") is None
+    assert parse_entry(b"[1, 2]") is None
+    assert parse_entry(b"42") is None
+    assert parse_entry(b'{"MESSAGE": "no timestamp"}') is None
+    assert parse_entry(b'{"__REALTIME_TIMESTAMP": "soon"}') is None
+
+
+def test_read_line_batches_joins_lines_split_across_reads():
+    r, w = os.pipe()
+    os.write(w, b"one\n\ntwo\nthree\n  \nfour")
+    os.close(w)
+    with os.fdopen(r, "rb", buffering=0) as stream:
+        batches = list(read_line_batches(stream, chunk_size=5))
+    assert [line for batch in batches for line in batch] == [b"one", b"two", b"three", b"four"]
+    assert all(batches)
+
+
+def _frames(*batches):
+    out = io.BytesIO()
+    for batch in batches:
+        _send(out, batch)
+    return out.getvalue()
+
+
+def test_frame_reader_whole_stream():
+    batches = [[("6", "ts", "a", "text a")], [("3", "ts", "b", "text b"), ("4", "", "", "")]]
+    assert FrameReader().feed(_frames(*batches)) == batches
+
+
+def test_frame_reader_split_reads():
+    batches = [[("6", "ts", f"msg {i}", "x" * i)] for i in range(50)]
+    data = _frames(*batches)
+    rng = random.Random(0)
+    for _round in range(20):
+        frames = FrameReader()
+        got = []
+        pos = 0
+        while pos < len(data):
+            step = rng.randint(1, 64)
+            got += frames.feed(data[pos:pos + step])
+            pos += step
+        assert got == batches
+
+
+def test_frame_reader_one_byte_at_a_time():
+    batches = [[("5", "ts", "m", "t")], [("7", "ts", "n", "u")]]
+    frames = FrameReader()
+    got = []
+    for b in _frames(*batches):
+        got += frames.feed(bytes([b]))
+    assert got == batches
+
+
+def _run_reader(cmd, cwd=None):
+    out = subprocess.run(reader_cmd(cmd), stdout=subprocess.PIPE, cwd=cwd, check=True, timeout=30).stdout
+    return [entry for batch in FrameReader().feed(out) for entry in batch]
+
+
+def test_reader_process_parses_command_output():
+    lines = b"\n".join([_line(PRIORITY="4", MESSAGE="warn"), b"garbage", _line(MESSAGE="info")])
+    script = f"import sys; sys.stdout.buffer.write({lines!r})"
+    entries = _run_reader([sys.executable, "-c", script])
+    assert [(prio, msg) for prio, _ts, msg, _text in entries] == [("4", "warn"), ("6", "info")]
+
+
+def test_reader_process_reports_missing_command():
+    entries = _run_reader(["/nonexistent/journalctl"])
+    assert len(entries) == 1
+    assert entries[0][0] == "3"
+
+
+def test_reader_process_ignores_modules_in_working_directory(tmp_path):
+    # The GUI usually runs in $HOME; files there must not shadow the stdlib
+    for name in ("struct", "pickle", "signal", "subprocess", "datetime", "json", "orjson"):
+        (tmp_path / f"{name}.py").write_text("raise SystemExit(3)\n")
+    log = tmp_path / "journal.json"
+    log.write_bytes(_line(MESSAGE="hello") + b"\n")
+    entries = _run_reader(["cat", str(log)], cwd=tmp_path)
+    assert [msg for _prio, _ts, msg, _text in entries] == ["hello"]
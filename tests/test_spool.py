@@ -0,0 +1,118 @@
+"""Tests for the export text spool and its logical offsets."""
+import os
+import random
+
+from log_viewer.spool import ExportSpool
+
+
+def _export(spool, tmp_path):
+    path = tmp_path / "export.txt"
+    with open(path, "wb") as f:
+        spool.copy_to(f)
+    return path.read_bytes()
+
+
+def _file_size(spool):
+    spool._file.flush()
+    return os.fstat(spool._file.fileno()).st_size
+
+
+def test_append_returns_end_offsets(tmp_path):
+    spool = ExportSpool()
+    assert spool.append(["one", "twö"]) == [4, 9]
+    assert spool.append([]) == []
+    assert spool.end == 9
+    assert _export(spool, tmp_path) == "one\ntwö\n".encode()
+
+
+def test_append_replaces_unencodable_text(tmp_path):
+    spool = ExportSpool()
+    spool.append(["bad \udcff"])
+    assert _export(spool, tmp_path) == b"bad ?\n"
+
+
+def test_forget_upto_drops_prefix(tmp_path):
+    spool = ExportSpool()
+    ends = spool.append(["a", "bb", "ccc"])
+    spool.forget_upto(ends[0])
+    assert _export(spool, tmp_path) == b"bb\nccc\n"
+    spool.forget_upto(ends[2])
+    assert _export(spool, tmp_path) == b""
+
+
+def test_compaction_keeps_live_text(tmp_path):
+    spool = ExportSpool(compact_bytes=0)
+    ends = spool.append(["old"] * 10 + ["live"])
+    spool.forget_upto(ends[-2])
+    assert _file_size(spool) == len(b"live\n")
+    ends = spool.append(["new"])
+    assert ends == [spool.end]
+    assert _export(spool, tmp_path) == b"live\nnew\n"
+    spool.forget_upto(ends[0] - len(b"new\n"))
+    assert _export(spool, tmp_path) == b"new\n"
+
+
+def test_clear(tmp_path):
+    spool = ExportSpool(compact_bytes=0)
+    spool.forget_upto(spool.append(["x", "y"])[0])
+    spool.clear()
+    assert spool.end == 0
+    assert spool.append(["z"]) == [2]
+    assert _export(spool, tmp_path) == b"z\n"
+
+
+class _View:
+    """The row cap bookkeeping of LogViewerWindow, with a list as the store.
+
+    Rows are (text, end) pairs; error rows have no text and end where the
+    spool ended when they were added.
+    """
+
+    def __init__(self, spool, cap):
+        self.spool = spool
+        self.cap = cap
+        self.store = []
+
+    def add_entries(self, texts):
+        self._add_rows(list(zip(texts, self.spool.append(texts))))
+
+    def add_error(self):
+        self._add_rows([(None, self.spool.end)])
+
+    def _add_rows(self, rows):
+        self.trim(self.cap - len(rows))
+        if len(rows) > self.cap:
+            self.spool.forget_upto(rows[-self.cap - 1][1])
+            rows = rows[-self.cap:]
+        self.store += rows
+
+    def trim(self, keep):
+        excess = len(self.store) - max(keep, 0)
+        if excess <= 0:
+            return
+        self.spool.forget_upto(self.store[excess - 1][1])
+        del self.store[:excess]
+
+    def expected(self):
+        return "".join(text + "\n" for text, _end in self.store if text is not None).encode()
+
+
+def test_export_matches_kept_rows(tmp_path):
+    rng = random.Random(0)
+    for compact_bytes in (0, 64, 1 << 20):
+        view = _View(ExportSpool(compact_bytes=compact_bytes), cap=20)
+        serial = 0
+        for _step in range(500):
+            action = rng.random()
+            if action < 0.1:
+                view.add_error()
+            elif action < 0.15:
+                view.cap = rng.randint(1, 40)
+                view.trim(view.cap)
+            else:
+                # Batches are sometimes larger than the whole cap
+                n = rng.choice([0, 1, 3, 10, 50])
+                view.add_entries([f"entry {serial + i} " + "x" * rng.randint(0, 30) for i in range(n)])
+                serial += n
+            assert len(view.store) <= view.cap
+            assert _export(view.spool, tmp_path) == view.expected()